@@ -9,25 +9,109 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import weakref
+from typing import TYPE_CHECKING, NamedTuple
 
 import numpy as np
-from ldpc import mod2
 from qiskit.quantum_info import Clifford
 
 if TYPE_CHECKING:  # pragma: no cover
     import numpy.typing as npt
     from qiskit import QuantumCircuit
 
+# Maps id(circuit) to the number of instructions at extraction time and the extracted X and Z stabilizers
+_STABS_CSS_CACHE: dict[int, tuple[int, npt.NDArray[np.int_], npt.NDArray[np.int_]]] = {}
+
+
+def _pack_rows(m: npt.ArrayLike) -> npt.NDArray[np.uint64]:
+    """Pack the rows of a binary matrix into 64-bit words.
+
+    Column ``c`` is stored in word ``c >> 6``. Rows are zero-padded to a multiple of 64 columns.
+    """
+    m = np.atleast_2d(np.asarray(m) % 2).astype(np.uint8)
+    n_words = (m.shape[1] + 63) // 64
+    packed = np.zeros((m.shape[0], 8 * n_words), dtype=np.uint8)
+    packed[:, : (m.shape[1] + 7) // 8] = np.packbits(m, axis=1, bitorder="little")
+    return packed.view("<u8")
+
+
+class PackedBasis(NamedTuple):
+    """Reduced row echelon form of a binary matrix with rows packed into 64-bit words."""
+
+    rows: npt.NDArray[np.uint64]
+    pivots: list[tuple[int, np.uint64]]  # word index and bit mask of the pivot of each row
+
+
+def echelon(m: npt.ArrayLike) -> PackedBasis:
+    """Compute the reduced row echelon form of a binary matrix over GF(2).
+
+    Only the non-zero rows are kept, so they form a basis of the row space of the matrix.
+    """
+    m = np.atleast_2d(m)
+    rows = _pack_rows(m)
+    pivots: list[tuple[int, np.uint64]] = []
+    for c in range(m.shape[1]):
+        rank = len(pivots)
+        if rank == len(rows):
+            break
+        w, mask = c >> 6, np.uint64(1 << (c & 63))
+        candidates = np.flatnonzero(rows[rank:, w] & mask) + rank
+        if len(candidates) == 0:
+            continue
+        pivot = candidates[0]
+        rows[[rank, pivot]] = rows[[pivot, rank]]
+        targets = np.flatnonzero(rows[:, w] & mask)
+        targets = targets[targets != rank]
+        rows[targets] ^= rows[rank]
+        pivots.append((w, mask))
+    return PackedBasis(rows[: len(pivots)], pivots)
+
 
 def eq_span(a: npt.NDArray[np.int_], b: npt.NDArray[np.int_]) -> bool:
     """Check if two matrices have the same row space."""
-    return (a.shape[1] == b.shape[1]) and (int(mod2.rank(np.vstack((a, b)))) == int(mod2.rank(a)) == int(mod2.rank(b)))
+    return (a.shape[1] == b.shape[1]) and np.array_equal(echelon(a).rows, echelon(b).rows)
+
+
+def in_span_precomputed(basis: PackedBasis, v: npt.ArrayLike) -> bool:
+    """Check if a vector is in the row space spanned by a basis computed with :func:`echelon`."""
+    reduced = _pack_rows(v)[0]
+    for row, (w, mask) in zip(basis.rows, basis.pivots):
+        if reduced[w] & mask:
+            reduced ^= row
+    return not np.any(reduced)
 
 
 def in_span(m: npt.NDArray[np.int_], v: npt.NDArray[np.int_]) -> bool:
     """Check if a vector is in the row space of a matrix over GF(2)."""
-    return bool(mod2.rank(np.vstack((m, v))) == mod2.rank(m))
+    return in_span_precomputed(echelon(m), v)
+
+
+def _popcount(a: npt.NDArray[np.uint64]) -> npt.NDArray[np.uint8]:
+    """Count the set bits of every entry of an array of 64-bit words."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(a)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    counts: npt.NDArray[np.uint8] = (
+        table[np.ascontiguousarray(a).view(np.uint8)].reshape(*a.shape, 8).sum(axis=-1, dtype=np.uint8)
+    )
+    return counts
+
+
+def weight(m: npt.ArrayLike) -> int:
+    """Return the number of non-zero entries of a binary matrix."""
+    return int(_popcount(_pack_rows(m)).sum())
+
+
+def gf2_detect(stabs: npt.ArrayLike, errors: npt.ArrayLike) -> npt.NDArray[np.intp]:
+    """Return the indices of the errors that are not detected by any of the stabilizers.
+
+    The syndrome bits are computed on bit-packed rows as the parity of the popcount of ``stab & error``.
+    """
+    packed_stabs = _pack_rows(stabs)
+    packed_errors = _pack_rows(errors)
+    overlap = np.bitwise_xor.reduce(packed_stabs[:, np.newaxis, :] & packed_errors[np.newaxis, :, :], axis=2)
+    syndromes = _popcount(overlap) & 1
+    return np.flatnonzero(~syndromes.any(axis=0))
 
 
 def get_stabs_css_with_indices(
@@ -61,7 +145,8 @@ def get_stabs_css_with_indices(
 def get_stabs_css(qc: QuantumCircuit) -> tuple[npt.NDArray[np.int_], npt.NDArray[np.int_]]:
     """Return the stabilizers of a quantum circuit.
 
-    Assumes that stabilizers are CSS.
+    Assumes that stabilizers are CSS. The result is cached per circuit object until the circuit is garbage collected
+    or instructions are added to it. The returned arrays are read-only.
 
     Args:
         qc: The quantum circuit.
@@ -71,6 +156,11 @@ def get_stabs_css(qc: QuantumCircuit) -> tuple[npt.NDArray[np.int_], npt.NDArray
         z: The Z stabilizers.
 
     """
+    key = id(qc)
+    cached = _STABS_CSS_CACHE.get(key)
+    if cached is not None and cached[0] == len(qc.data):
+        return cached[1], cached[2]
+
     cliff = Clifford(qc)
     x = cliff.stab_x.astype(int)
     x_indices = np.where(np.logical_not(np.all(x == 0, axis=1)))[0]
@@ -80,4 +170,9 @@ def get_stabs_css(qc: QuantumCircuit) -> tuple[npt.NDArray[np.int_], npt.NDArray
     z_indices = np.where(np.logical_not(np.all(z == 0, axis=1)))[0]
 
     z = z[z_indices]
+    x.flags.writeable = False
+    z.flags.writeable = False
+    if cached is None:
+        weakref.finalize(qc, _STABS_CSS_CACHE.pop, key, None)
+    _STABS_CSS_CACHE[key] = (len(qc.data), x, z)
     return x, z